@@ -5,6 +5,11 @@ from pathlib import Path
 from typing import List, Optional
 from .constants import DEFAULT_TESSERACT_PATHS
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 _LOGGER = logging.getLogger(__name__)
 _CONFIG_FILE = Path("config.json")
 
@@ -27,7 +32,8 @@ class Config:
         """
         if _CONFIG_FILE.exists():
             try:
-                data = json.loads(_CONFIG_FILE.read_text(encoding="utf-8"))
+                raw = _CONFIG_FILE.read_bytes()
+                data = orjson.loads(raw) if orjson else json.loads(raw)
                 cfg = cls(**data)
                 _LOGGER.info("Configuration loaded from %s", _CONFIG_FILE)
                 return cfg
@@ -47,10 +53,11 @@ class Config:
     def save(self) -> None:
         """Shrane trenutn config JSON"""
         try:
-            _CONFIG_FILE.write_text(
-                json.dumps(asdict(self), indent=2),
-                encoding="utf-8"
-            )
+            if orjson:
+                raw = orjson.dumps(asdict(self), option=orjson.OPT_INDENT_2)
+            else:
+                raw = json.dumps(asdict(self), indent=2).encode("utf-8")
+            _CONFIG_FILE.write_bytes(raw)
             _LOGGER.info("Configuration saved to %s", _CONFIG_FILE)
         except Exception as e:
             _LOGGER.error("Failed to save config: %s", e)
@@ -1,4 +1,30 @@
+import os
 import re
+from functools import lru_cache
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# RE2 (linearni DFA, brez backtrackinga) za iskanje po OCR besedilu, če je na voljo.
+# BAJOCR_RE2=0 vsili standardni `re`.
+USE_RE2 = re2 is not None and os.environ.get("BAJOCR_RE2", "1") != "0"
+
+
+def _compile(pattern: str):
+    """compile z RE2 kadar je možno, sicer fallback na `re` (npr. lookaround)."""
+    if USE_RE2:
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern)
 
 DEFAULT_TESSERACT_PATHS = [
     r'C:\Program Files\Tesseract-OCR\tesseract.exe',
@@ -9,33 +35,83 @@ DEFAULT_TESSERACT_PATHS = [
 FILENAME_TEMPLATE = "{date}_{entity}.png"
 IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']
 LOG_FILE = 'ocr_processor.log'
+MAX_IMAGE_SIZE = 2000
+
+MONTH_MAP = {
+    'januar': '01', 'februar': '02', 'marec': '03', 'april': '04',
+    'maj': '05', 'junij': '06', 'julij': '07', 'avgust': '08',
+    'september': '09', 'oktober': '10', 'november': '11', 'december': '12'
+}
+
+# alternacija mesecev iz MONTH_MAP (najdaljši najprej), da detektor in pretvorba ostaneta usklajena
+_MONTH_ALT = '|'.join(re.escape(m) for m in sorted(MONTH_MAP, key=len, reverse=True))
 
-DATE_PATTERNS = [
-    re.compile(r'(\d{1,2})[./-](\d{1,2})[./-](\d{4})'),
-    re.compile(r'(\d{4})[./-](\d{1,2})[./-](\d{1,2})'),
-    re.compile(
-        r'(\d{1,2})\s+'
-        r'(januar|februar|marec|april|maj|junij|julij|avgust|'
-        r'september|oktober|november|december)\s+(\d{4})',
-        re.IGNORECASE
-    ),
+# Datumske vzorce poganjamo nad preprocess_text(besedilo), zato so brez IGNORECASE.
+_DATE_SRC = [
+    r'(\d{1,2})[./-](\d{1,2})[./-](\d{4})',
+    r'(\d{4})[./-](\d{1,2})[./-](\d{1,2})',
+    rf'(\d{{1,2}})\s+({_MONTH_ALT})\s+(\d{{4}})',
 ]
 
-NAME_PATTERNS = [
-    re.compile(
-        r'^([A-ZČŠŽĆĐ][a-zčšžćđ]+)\s+([A-ZČŠŽĆĐ][a-zčšžćđ]+)'
-        r'(?:\s+([A-ZČŠŽĆĐ][a-zčšžćđ]+))?$'
-    ),
-    re.compile(r'^([A-ZČŠŽĆĐ]{2,})\s+([A-ZČŠŽĆĐ]{2,})$'),
+# Imenski vzorci so brez ^/$, ker se uporabljajo s fullmatch().
+_NAME_SRC = [
+    r'([A-ZČŠŽĆĐ][a-zčšžćđ]+)\s+([A-ZČŠŽĆĐ][a-zčšžćđ]+)'
+    r'(?:\s+([A-ZČŠŽĆĐ][a-zčšžćđ]+))?',
+    r'([A-ZČŠŽĆĐ]{2,})\s+([A-ZČŠŽĆĐ]{2,})',
 ]
 
+def preprocess_text(text: str) -> str:
+    """casefold enkrat na dokument namesto IGNORECASE v vsakem regexu."""
+    return text.casefold()
+
+# Vzorci se prevedejo enkrat, ob prvi uporabi; vsi klicatelji dobijo iste objekte.
+@lru_cache(maxsize=None)
+def date_patterns():
+    """prevedeni DATE_PATTERNS (po vrstnem redu prednosti)."""
+    return tuple(_compile(src) for src in _DATE_SRC)
+
+@lru_cache(maxsize=None)
+def name_patterns():
+    """prevedeni NAME_PATTERNS."""
+    return tuple(_compile(src) for src in _NAME_SRC)
+
+@lru_cache(maxsize=None)
+def name_regex():
+    """vsi imenski vzorci v eni alternaciji za fullmatch; veja = m.lastgroup ('n0', 'n1', ...)."""
+    return _compile('|'.join(f'(?P<n{i}>{src})' for i, src in enumerate(_NAME_SRC)))
+
 NAME_INDICATORS = [
     'priimek in ime', 'ime in priimek', 'ime:', 'priimek:',
     'podpisnik', 'podpisuje', 'izvršitelj', 'direktor', 'vodja'
 ]
 
-MONTH_MAP = {
-    'januar': '01', 'februar': '02', 'marec': '03', 'april': '04',
-    'maj': '05', 'junij': '06', 'julij': '07', 'avgust': '08',
-    'september': '09', 'oktober': '10', 'november': '11', 'december': '12'
+@lru_cache(maxsize=None)
+def _name_indicator_matcher():
+    """Aho-Corasick avtomat (pyahocorasick) ali regex alternacija kot fallback."""
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for word in NAME_INDICATORS:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        return automaton
+    return _compile('|'.join(re.escape(word) for word in NAME_INDICATORS))
+
+def find_name_indicators(text: str) -> list:
+    """vsi NAME_INDICATORS v besedilu (malih črk) v enem prehodu."""
+    matcher = _name_indicator_matcher()
+    if ahocorasick is not None:
+        return [word for _, word in matcher.iter(text)]
+    return [m.group(0) for m in matcher.finditer(text)]
+
+
+_LAZY_PATTERNS = {
+    'DATE_PATTERNS': date_patterns,
+    'NAME_PATTERNS': name_patterns,
+    'NAME_REGEX': name_regex,
 }
+
+def __getattr__(name):
+    """stara imena (DATE_PATTERNS, ...) ostanejo dostopna, prevedena lenobno."""
+    if name in _LAZY_PATTERNS:
+        return _LAZY_PATTERNS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
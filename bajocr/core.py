@@ -1,58 +1,307 @@
+from __future__ import annotations
+
 import json
 import os
+import sys
+import tempfile
 import time
 import logging
-import multiprocessing
-from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import chain, repeat
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple, Union
 
 import pytesseract
 from PIL import Image
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .constants import (
-    DEFAULT_TESSERACT_PATHS,
     FILENAME_TEMPLATE,
     IMAGE_EXTENSIONS,
-    DATE_PATTERNS,
-    NAME_PATTERNS,
-    NAME_INDICATORS,
+    MAX_IMAGE_SIZE,
+    date_patterns,
+    name_regex,
+    preprocess_text,
+    find_name_indicators,
     MONTH_MAP,
 )
-from .utils import setup_logging, preprocess_image, sanitize_filename, ensure_unique_path
+from .utils import (
+    setup_logging,
+    downscale_image,
+    is_blank_page,
+    load_ocr_image,
+    prefetch_file,
+    drop_duplicate_files,
+    find_tesseract_executable,
+    preprocess_image,
+    sanitize_filename,
+    rename_unique,
+    write_bytes_unique,
+)
+
+# concurrent.futures/multiprocessing se uvozita šele v paketnih poteh (hitrejši import)
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
 
 _LOGGER = logging.getLogger(__name__)
+_IMAGE_EXT_SET = frozenset(e.lower() for e in IMAGE_EXTENSIONS)
+_PDF_FILENAME_TEMPLATE = FILENAME_TEMPLATE.replace('.png', '.pdf')
+
+# OCR za preimenovanje; paket = največ toliko slik na en zagon Tesseracta (brez tesserocr)
+_RENAME_LANG = 'slv+eng'
+_RENAME_CONFIG = '--psm 6 --oem 3'
+_OCR_BATCH_SIZE = 16
+
+def _chunksize(n_items: int, workers: int) -> int:
+    """velikost paketa za pool.map: ~4 paketi na proces, da se IPC amortizira."""
+    return max(1, n_items // (4 * workers))
+
+class _BatchedPrinter:
+    """vrstice rezultatov izpiše v paketih (en write + flush), najkasneje po `interval` sekundah."""
+
+    def __init__(self, size: int = 64, interval: float = 0.5):
+        self.size = size
+        self.interval = interval
+        self._lines = []
+        self._last = time.monotonic()
+
+    def __call__(self, line: str):
+        self._lines.append(line)
+        if len(self._lines) >= self.size or time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            sys.stdout.write('\n'.join(self._lines) + '\n')
+            sys.stdout.flush()
+            self._lines.clear()
+        self._last = time.monotonic()
+
+def _mp_context():
+    """
+    forkserver, kjer obstaja (čisti procesi brez podedovanih niti/ročajev), sicer privzeti.
+
+    forkserver ta modul (PIL, pytesseract, cv2, ...) uvozi enkrat; procesi poola se razcepijo
+    iz njega in si uvožene strani delijo (COW), namesto da vsak uvaža znova.
+    """
+    import multiprocessing
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return None
+
+def _omp_threads(workers: int) -> Optional[int]:
+    """
+    OpenMP niti Tesseracta na proces: skupaj največ toliko kot jeder, na proces največ 4.
+    None, če je OMP_THREAD_LIMIT nastavil uporabnik (procesi ga podedujejo).
+    """
+    if 'OMP_THREAD_LIMIT' in os.environ:
+        return None
+    return max(1, min(4, (os.cpu_count() or 1) // max(1, workers)))
+
+def _init_worker(tesseract_path=None, omp_threads=None):
+    """initializer procesa v poolu: pot do Tesseracta in regexi se pripravijo enkrat, ne ob prvi nalogi."""
+    if omp_threads:
+        # pred prvim uvozom tesserocr (glej _import_tesserocr) in za vse tesseract podprocese
+        os.environ['OMP_THREAD_LIMIT'] = str(omp_threads)
+    _use_tesseract(tesseract_path)
+    date_patterns()
+    name_regex()
+    find_name_indicators('')
+
+def _use_tesseract(tesseract_path=None):
+    """nastavi pytesseract na (predpomnjeno) pot do Tesseracta; brez dela, če je že nastavljena."""
+    path = find_tesseract_executable(tesseract_path)
+    if path and pytesseract.pytesseract.tesseract_cmd != path:
+        pytesseract.pytesseract.tesseract_cmd = path
+    return path
+
+# tesserocr (neobvezen) se uvozi šele ob prvi uporabi: libtesseract/libgomp OMP_THREAD_LIMIT
+# prebereta ob nalaganju, zato ga mora _init_worker nastaviti pred uvozom (tudi v forkserverju)
+tesserocr = None
+_TESSEROCR_CHECKED = False
+
+def _import_tesserocr():
+    """modul tesserocr ali None, če ni nameščen; uvoz samo enkrat na proces."""
+    global tesserocr, _TESSEROCR_CHECKED
+    if not _TESSEROCR_CHECKED:
+        _TESSEROCR_CHECKED = True
+        try:
+            import tesserocr as module
+        except ImportError:
+            module = None
+        tesserocr = module
+    return tesserocr
+
+# tesserocr API na proces, po (lang, config); PID zazna otroke po fork-u
+_TESS_APIS = {}
+_TESS_APIS_PID = None
+
+def _parse_tess_config(config: str):
+    """'--psm 6 --oem 3 -c k=v' -> (psm, oem, {k: v}) za tesserocr."""
+    psm, oem, variables = None, None, {}
+    args = iter(config.split())
+    for arg in args:
+        value = next(args, '') if arg in ('--psm', '--oem', '-c') else ''
+        if arg == '--psm' and value.isdigit():
+            psm = int(value)
+        elif arg == '--oem' and value.isdigit():
+            oem = int(value)
+        elif arg == '-c' and '=' in value:
+            key, _, val = value.partition('=')
+            variables[key] = val
+    return psm, oem, variables
+
+def _tessdata_dir() -> Optional[str]:
+    """tessdata poleg nastavljenega tesseract.exe (Windows namestitev), sicer privzeta pot."""
+    candidate = Path(pytesseract.pytesseract.tesseract_cmd).parent / 'tessdata'
+    return str(candidate) if candidate.is_dir() else None
+
+def _tess_api(lang: str, config: str):
+    """PyTessBaseAPI, inicializiran enkrat na proces; None, če tesserocr ni na voljo."""
+    global _TESS_APIS_PID
+    if _import_tesserocr() is None:
+        return None
+    if _TESS_APIS_PID != os.getpid():
+        _TESS_APIS.clear()
+        _TESS_APIS_PID = os.getpid()
+    key = (lang, config)
+    if key not in _TESS_APIS:
+        psm, oem, variables = _parse_tess_config(config)
+        kwargs = {'lang': lang, 'variables': variables}
+        if psm is not None:
+            kwargs['psm'] = psm
+        if oem is not None:
+            kwargs['oem'] = oem
+        tessdata = _tessdata_dir()
+        if tessdata:
+            kwargs['path'] = tessdata
+        try:
+            _TESS_APIS[key] = tesserocr.PyTessBaseAPI(**kwargs)
+        except Exception as e:
+            _LOGGER.warning("tesserocr init failed (%s), falling back to pytesseract", e)
+            _TESS_APIS[key] = None
+    return _TESS_APIS[key]
+
+def _uncompressed_temp(image):
+    """
+    pytesseract sliko brez formata shrani v začasen PNG (zlib, do ~0.3 s na stran);
+    BMP je nekomprimiran, Tesseract ga bere enako.
+    """
+    if isinstance(image, Image.Image) and image.format is None and image.mode in ('1', 'L', 'P', 'RGB'):
+        image.format = 'BMP'
+    return image
+
+def _ocr_text(image, lang: str, config: str) -> str:
+    """OCR besedila v procesu (tesserocr, model se naloži enkrat), sicer pytesseract subprocess."""
+    api = _tess_api(lang, config)
+    if api is None:
+        return pytesseract.image_to_string(_uncompressed_temp(image), lang=lang, config=config)
+    if image.mode == 'L':
+        # surovi piksli neposredno v libtesseract, brez vmesnega kodiranja slike
+        width, height = image.size
+        api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        # surovi piksli nimajo DPI (pri SetImage ga prenese BMP glava)
+        dpi = image.info.get('dpi')
+        if dpi and dpi[0] > 0:
+            api.SetSourceResolution(int(round(dpi[0])))
+    else:
+        api.SetImage(image)
+    text = api.GetUTF8Text()
+    # sprosti sliko in rezultate v API-ju (ostane v predpomnilniku procesa), model ostane naložen
+    api.Clear()
+    return text
+
+def _ocr_pdf_and_text(image, lang: str, config: str) -> Tuple[bytes, str]:
+    """ena razpoznava za PDF in besedilo: tesseract ... pdf -c tessedit_create_txt=1 (.txt stranski izhod)."""
+    tess = pytesseract.pytesseract
+    with tess.save(_uncompressed_temp(image)) as (temp_name, input_filename):
+        tess.run_tesseract(
+            input_filename, temp_name, 'pdf', lang, f'-c tessedit_create_txt=1 {config}'.strip()
+        )
+        with open(f'{temp_name}.pdf', 'rb') as f:
+            pdf_bytes = f.read()
+        with open(f'{temp_name}.txt', encoding='utf-8') as f:
+            text = f.read()
+    return pdf_bytes, text
+
+def _ocr_each(images, lang: str, config: str) -> List[Union[str, Exception]]:
+    """_ocr_text za vsako sliko posebej; napaka ene slike ostane na njenem mestu v seznamu."""
+    texts = []
+    for image in images:
+        try:
+            texts.append(_ocr_text(image, lang, config))
+        except Exception as e:
+            texts.append(e)
+    return texts
+
+def _ocr_texts(images, lang: str, config: str) -> List[Union[str, Exception]]:
+    """
+    OCR več slik hkrati. S tesserocr zaporedno v istem API-ju, sicer en zagon Tesseracta
+    s seznamom datotek; strani v izhodu loči page_separator (\\f).
+
+    Vrne besedilo ali izjemo za vsako sliko, po vrstnem redu vhodov.
+    """
+    if len(images) < 2 or _tess_api(lang, config) is not None:
+        return _ocr_each(images, lang, config)
+
+    pages = []
+    with tempfile.TemporaryDirectory(prefix='bajocr_') as tmp:
+        paths = []
+        for i, image in enumerate(images):
+            path = os.path.join(tmp, f'{i}.bmp')
+            image.save(path, format='BMP')
+            paths.append(path)
+        list_path = os.path.join(tmp, 'images.lst')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(paths) + '\n')
+        out_base = os.path.join(tmp, 'out')
+        try:
+            pytesseract.pytesseract.run_tesseract(list_path, out_base, 'txt', lang, config)
+            with open(out_base + '.txt', encoding='utf-8') as f:
+                pages = f.read().split('\f')
+        except Exception as e:
+            _LOGGER.warning("Paketni OCR ni uspel (%s), nadaljujem po slikah", e)
+
+    # paket ni uspel ali manj strani kot slik (poravnava ni zanesljiva): posamezno
+    if len(pages) < len(images):
+        return _ocr_each(images, lang, config)
+    return pages[:len(images)]
 
 def _convert_image_to_pdf(
     img_path: str,
-    tesseract_path: Optional[str],
     lang: str,
-    extra_args: List[str]
+    config: str,
+    max_dim: int = MAX_IMAGE_SIZE,
+    next_path: Optional[str] = None,
 ) -> Tuple[str, bool, str, float]:
+    """worker v poolu (pot do Tesseracta nastavi _init_worker); vrne (pot, ok, pdf ali napaka, čas)."""
     start = time.time()
+    # naslednja slika v istem paketu se bere z diska, medtem ko OCR teče na tej
+    prefetch_file(next_path)
     try:
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-
-        # Open with context manager
+        # en zagon Tesseracta: PDF + besedilo za ime; brez ponovnega kodiranja, če slika ni prevelika
         with Image.open(img_path) as img:
-            processed_img = preprocess_image(img.copy())
-            text = pytesseract.image_to_string(processed_img, lang=lang, config=' '.join(extra_args))
-
-            # call local helpers (defined below)
-            date = extract_date_worker(text)
-            entity = extract_name_worker(text) or "NEZNANO_IME"
+            page = downscale_image(img, max_dim)
+            pdf_bytes, text = _ocr_pdf_and_text(
+                img_path if page is img else page, lang, config
+            )
 
-            filename_pdf = FILENAME_TEMPLATE.replace('.png', '.pdf').format(date=date, entity=entity)
-            filename_pdf = sanitize_filename(filename_pdf)
-            pdf_path = ensure_unique_path(Path(img_path).with_name(filename_pdf))
+        # call local helpers (defined below)
+        date = extract_date_worker(text)
+        entity = extract_name_worker(text) or "NEZNANO_IME"
 
-            pdf_bytes = pytesseract.image_to_pdf_or_hocr(
-                img, extension='pdf', lang=lang, config=' '.join(extra_args)
-            )
-            with open(pdf_path, 'wb') as f:
-                f.write(pdf_bytes)
+        filename_pdf = _PDF_FILENAME_TEMPLATE.format(date=date, entity=entity)
+        filename_pdf = sanitize_filename(filename_pdf)
+        pdf_path = write_bytes_unique(Path(img_path).with_name(filename_pdf), pdf_bytes)
 
         elapsed = time.time() - start
         return img_path, True, str(pdf_path), elapsed
@@ -69,20 +318,65 @@ class BajOCR:
         self.tesseract_path = self._setup_tesseract_path(tesseract_path)
         setup_logging(log_level)
         self.logger = logging.getLogger(__name__)
-        self.processed_files = set()
         self._reset_stats()
-        self._current_date = datetime.today().strftime("%d-%m-%Y")
+        self._pool = None
+        self._pool_key = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """ugasne dolgoživ pool procesov (če obstaja)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            self._pool_key = None
+
+    def _get_pool(self, max_workers: int) -> ProcessPoolExecutor:
+        """
+        pool se ohrani med klici; nov se ustvari ob spremembi števila procesov ali poti
+        in ko je obstoječi pokvarjen (proces se je sesul: OOM, segfault v tesserocr, ...).
+        """
+        key = (max_workers, self.tesseract_path)
+        if self._pool is None or self._pool_key != key or self._pool._broken:
+            from concurrent.futures import ProcessPoolExecutor
+            self.close()
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=_mp_context(),
+                initializer=_init_worker,
+                initargs=(self.tesseract_path, _omp_threads(max_workers)),
+            )
+            self._pool_key = key
+        return self._pool
+
+    @staticmethod
+    def _resolve_workers(requested: Optional[int], n_items: int) -> int:
+        """nikoli več procesov kot slik ali jeder."""
+        cpu = os.cpu_count() or 1
+        return max(1, min(requested or cpu, n_items, cpu))
+
+    def _run_pool(self, worker, items: list, workers: int, *args):
+        """
+        worker(item, *args, next_item) za vsak element (pot ali paket poti) v dolgoživem poolu.
+
+        Elementi gredo v paketih (pool.map z chunksize); next_item je naslednji element za prefetch.
+        Rezultati pridejo po vrstnem redu vhodov.
+        """
+        return self._get_pool(workers).map(
+            worker,
+            items,
+            *(repeat(arg) for arg in args),
+            items[1:] + [None],
+            chunksize=_chunksize(len(items), workers),
+        )
 
     def _setup_tesseract_path(self, tesseract_path):
         """set Tesseract path z caching in return path."""
-        if tesseract_path:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_path
-            return tesseract_path
-        for path in DEFAULT_TESSERACT_PATHS:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                return path
-        return None
+        return _use_tesseract(tesseract_path)
 
     def _reset_stats(self):
         """Reset processing statistics."""
@@ -102,10 +396,14 @@ class BajOCR:
         extra_args: List[str],
         max_workers: Optional[int] = None,
         file_extensions: Optional[List[str]] = None,
+        dedupe: bool = False,
+        max_dim: int = MAX_IMAGE_SIZE,
     ) -> bool:
         """
         vsako sliko v mapi pretvori v svoj PDF z iskalnim besedilom (searchable PDF), vzporedno
 
+dedupe=True preskoči slike z enako vsebino (npr. dvakrat skenirano)
+max_dim = največja daljša stranica (px) pred OCR; večje slike se zmanjšajo
 vrne True če je bil vsaj en PDF uspešno ustvarjen
         """
         folder = Path(folder_path)
@@ -113,48 +411,74 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
             _LOGGER.error("Folder not found: %s", folder)
             return False
 
-        exts = file_extensions or IMAGE_EXTENSIONS
         images = [
-            str(p) for p in folder.iterdir()
-            if p.is_file() and p.suffix.lower() in exts
+            str(p) for p in self.list_images(folder, file_extensions, sort=False, dedupe=dedupe)
         ]
         if not images:
             _LOGGER.warning("No images in folder: %s", folder)
             return False
 
-        workers = max_workers or None
+        workers = self._resolve_workers(max_workers, len(images))
         print(f"\nConverting {len(images)} images → PDF with up to "
-            f"{workers or 'all available'} processes...")
+            f"{workers} processes...")
 
         success_count = 0
-        with ProcessPoolExecutor(max_workers=workers) as pool:
-            futures = {
-                pool.submit(
-                    _convert_image_to_pdf,
-                    img,
-                    self.tesseract_path,
-                    lang,
-                    extra_args
-                ): img
-                for img in images
-            }
-            for fut in as_completed(futures):
-                img_path, ok, msg, elapsed = fut.result()
-                original_name = Path(img_path).name
+        results = self._run_pool(
+            _convert_image_to_pdf, images, workers,
+            lang, ' '.join(extra_args), max_dim,
+        )
+        out = _BatchedPrinter()
+        try:
+            for img_path, ok, msg, elapsed in results:
+                original_name = os.path.basename(img_path)
                 if ok:
-                    new_pdf_name = Path(msg).name
-                    print(f"[OK]    {original_name} → {new_pdf_name} ({elapsed:.2f}s)")
+                    new_pdf_name = os.path.basename(msg)
+                    out(f"[OK]    {original_name} → {new_pdf_name} ({elapsed:.2f}s)")
                     _LOGGER.info("PDF created: %s → %s", original_name, new_pdf_name)
                     success_count += 1
                 else:
-                    print(f"[FAIL]  {original_name}: {msg}")
+                    out(f"[FAIL]  {original_name}: {msg}")
                     _LOGGER.error("Failed PDF for %s: %s", original_name, msg)
+        except BrokenProcessPool as e:
+            out(f"[FAIL]  proces v poolu se je nepričakovano končal: {e}")
+            _LOGGER.error("Worker process died, aborting PDF conversion: %s", e)
+            self.close()
+        out.flush()
 
         return success_count > 0
 
+    def list_images(
+        self,
+        folder_path,
+        file_extensions: Optional[List[str]] = None,
+        sort: bool = True,
+        dedupe: bool = False,
+    ) -> List[Path]:
+        """
+        seznam slik v mapi (os.scandir: tip datoteke iz dirent, brez stat na vnos).
+
+        sort=False za paketne poti, kjer se rezultati zbirajo po vrstnem redu dokončanja.
+        dedupe=True izpusti datoteke z enako vsebino (glej drop_duplicate_files).
+        """
+        exts = _IMAGE_EXT_SET if file_extensions is None else frozenset(e.lower() for e in file_extensions)
+        with os.scandir(folder_path) as it:
+            images = [
+                Path(e.path) for e in it
+                if e.is_file()
+                and os.path.splitext(e.name)[1].lower() in exts
+            ]
+        if sort:
+            images.sort()
+        if dedupe:
+            unique = drop_duplicate_files(images)
+            if len(unique) < len(images):
+                self.logger.info("Preskočenih podvojenih slik: %d", len(images) - len(unique))
+            images = unique
+        return images
+
     def get_optimal_workers(self) -> int:
         """Pick a sensible default number of processes based on CPU count."""
-        cpu = multiprocessing.cpu_count()
+        cpu = os.cpu_count() or 1
         if cpu >= 8:
             return min(6, cpu - 2)
         if cpu >= 4:
@@ -165,30 +489,31 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         self,
         folder_path: str,
         max_workers: Optional[int] = None,
-        file_extensions: Optional[List[str]] = None
+        file_extensions: Optional[List[str]] = None,
+        max_dim: int = MAX_IMAGE_SIZE,
+        skip_blank: bool = False,
+        dedupe: bool = False,
     ) -> bool:
-        """Optimized parallel processing using ProcessPoolExecutor for CPU-bound tasks"""
-        if file_extensions is None:
-            file_extensions = IMAGE_EXTENSIONS
+        """
+        Optimized parallel processing using ProcessPoolExecutor for CPU-bound tasks
 
+        dedupe=True: datoteke z enako vsebino gredo v OCR samo enkrat, kopije ostanejo nepreimenovane
+        skip_blank=True: prazne strani (glej is_blank_page) se preskočijo brez OCR; privzeto vse gre v OCR
+        """
         folder_path = Path(folder_path)
         if not folder_path.exists():
-            self.logger.error(f"Mapa ne obstaja: {folder_path}")
+            self.logger.error("Mapa ne obstaja: %s", folder_path)
             return False
 
-        # Get all
-        image_files = [
-            f for f in folder_path.iterdir()
-            if f.is_file() and f.suffix.lower() in file_extensions
-        ]
+        image_files = self.list_images(folder_path, file_extensions, sort=False, dedupe=dedupe)
 
         if not image_files:
-            self.logger.warning(f"Ni najdenih slikovnih datotek v mapi: {folder_path}")
+            self.logger.warning("Ni najdenih slikovnih datotek v mapi: %s", folder_path)
             return False
 
-        if max_workers is None:
-            max_workers = self.get_optimal_workers()
-        max_workers = max(1, min(max_workers, len(image_files), multiprocessing.cpu_count()))
+        max_workers = self._resolve_workers(
+            max_workers or self.get_optimal_workers(), len(image_files)
+        )
 
         print(f"\nBajOCR PROCESSOR v1.0 (Optimized CPU Processing)")
         print(f"{'=' * 65}")
@@ -198,34 +523,49 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         print(f"{'=' * 65}")
 
         self.stats['start_time'] = time.time()
-        self.processed_files.clear()
 
         all_results = []
         successful = 0
         failed = 0
-
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(process_image_worker, str(fp), self.tesseract_path): fp
-                for fp in image_files
-            }
-
-            for future in as_completed(future_to_file):
-                result = future.result()
+        skipped = 0
+
+        # paketi po največ _OCR_BATCH_SIZE slik, vsaj dva na proces za enakomerno obremenitev
+        paths = [str(fp) for fp in image_files]
+        size = min(_OCR_BATCH_SIZE, max(1, len(paths) // (2 * max_workers)))
+        batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+        results = chain.from_iterable(self._run_pool(
+            process_image_batch_worker, batches, max_workers,
+            self.tesseract_path, max_dim, skip_blank,
+        ))
+
+        out = _BatchedPrinter()
+        try:
+            for result in results:
                 all_results.append(result)
 
-                if result.get('success'):
+                if result.get('skipped'):
+                    skipped += 1
+                    out(f"[SKIP]  {result['original']}: prazna stran, brez OCR")
+                elif result.get('success'):
                     successful += 1
-                    print(f"[OK]    {result['original']} → {result['new_name']} ({result['time']:.2f}s)")
+                    out(f"[OK]    {result['original']} → {result['new_name']} ({result['time']:.2f}s)")
                 else:
                     failed += 1
-                    print(f"[FAIL]  {result['original']}: {result['error']}")
+                    out(f"[FAIL]  {result['original']}: {result['error']}")
+        except BrokenProcessPool as e:
+            # preostale slike štejejo kot neuspele; naslednji klic ustvari nov pool
+            failed += len(image_files) - len(all_results)
+            out(f"[FAIL]  proces v poolu se je nepričakovano končal: {e}")
+            self.logger.error("Proces v poolu se je nepričakovano končal: %s", e)
+            self.close()
+        out.flush()
 
         self.stats.update({
             'end_time': time.time(),
             'processed': len(image_files),
             'successful': successful,
-            'failed': failed
+            'failed': failed,
+            'skipped': skipped
         })
 
         self.print_summary_enhanced()
@@ -236,7 +576,9 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         """print processing summary"""
         total_time = self.stats['end_time'] - self.stats['start_time']
         avg_time = total_time / self.stats['processed'] if self.stats['processed'] > 0 else 0
-        success_rate = (self.stats['successful'] / self.stats['processed'] * 100) if self.stats['processed'] > 0 else 0
+        # prazne strani (skipped) ne štejejo v stopnjo uspešnosti
+        attempted = self.stats['processed'] - self.stats['skipped']
+        success_rate = (self.stats['successful'] / attempted * 100) if attempted > 0 else 0
 
         print(f"\nPOVZETEK PROCESIRANJA")
         print(f"{'=' * 50}")
@@ -244,6 +586,8 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         print(f"Povprečni čas na datoteko: {avg_time:.2f}s")
         print(f"Uspešno procesiranih: {self.stats['successful']}")
         print(f"Neuspešnih: {self.stats['failed']}")
+        if self.stats['skipped']:
+            print(f"Preskočenih (prazne strani): {self.stats['skipped']}")
         print(f"Stopnja uspešnosti: {success_rate:.1f}%")
 
         if self.stats['failed'] > self.stats['successful']:
@@ -255,32 +599,33 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
 
     def save_report(self, folder_path, results):
         """save proces report"""
+        now = datetime.now()
         report = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now,
             'folder': str(folder_path),
             'statistics': self.stats,
             'results': results
         }
 
-        report_path = folder_path / f"ocr_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        report_path = folder_path / f"ocr_report_{now.strftime('%Y%m%d_%H%M%S')}.json"
         try:
-            with open(report_path, 'w', encoding='utf-8') as f:
-                json.dump(report, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"Poročilo shranjeno: {report_path}")
+            if orjson:
+                # datetime orjson zapiše sam (ISO 8601); NON_STR_KEYS za morebitne ne-str ključe v stats
+                raw = orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            else:
+                report['timestamp'] = now.isoformat()
+                raw = json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8')
+            report_path.write_bytes(raw)
+            self.logger.info("Poročilo shranjeno: %s", report_path)
             print(f"Poročilo shranjeno: {report_path}")
         except Exception as e:
-            self.logger.error(f"Napaka pri shranjevanju poročila: {e}")
+            self.logger.error("Napaka pri shranjevanju poročila: %s", e)
 
     def test_single_file(self, folder_path):
         """Test single file output"""
-        folder_path = Path(folder_path)
-        test_file = None
-
-        for ext in IMAGE_EXTENSIONS:
-            files = list(folder_path.glob(f"*{ext}")) + list(folder_path.glob(f"*{ext.upper()}"))
-            if files:
-                test_file = files[0]
-                break
+        # en os.scandir namesto dveh glob prehodov na končnico
+        images = self.list_images(folder_path) if os.path.isdir(folder_path) else []
+        test_file = images[0] if images else None
 
         if not test_file:
             print("Ni najdenih slikovnih datotek za test.")
@@ -290,10 +635,11 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         print(f"{'=' * 40}")
         print(f"Testiram: {test_file.name}")
 
-        self.processed_files.clear()
         result = self.process_single_image(str(test_file))
 
-        if result.get('success'):
+        if result.get('skipped'):
+            print(f"PRESKOČENO: {result['original']} je prazna stran (brez OCR)")
+        elif result.get('success'):
             print("USPEH")
             print(f"   Originalno ime: {result['original']}")
             print(f"   Novo ime: {result['new_name']}")
@@ -311,122 +657,203 @@ vrne True če je bil vsaj en PDF uspešno ustvarjen
         return process_image_worker(file_path, self.tesseract_path)
 
 # Worker func za model levl ProcessPoolExecutor 
-def process_image_worker(file_path, tesseract_path=None):
-    """Worker function locen proces"""
-    start_time = time.time()
-    filename = os.path.basename(file_path)
-
-    if tesseract_path:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_path
-    else:
-        for path in DEFAULT_TESSERACT_PATHS:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                break
-
+def _failed_result(file_path, error, start_time):
+    return {
+        'success': False,
+        'original': os.path.basename(file_path),
+        'error': str(error),
+        'time': time.time() - start_time
+    }
+
+def _prepare_for_ocr(file_path, max_dim, skip_blank, start_time):
+    """(slika za OCR, None) ali (None, končni rezultat) za manjkajočo, prazno ali pokvarjeno datoteko."""
     if not os.path.exists(file_path):
-        return {
-            'success': False,
-            'original': filename,
-            'error': 'Datoteka ne obstaja',
-            'time': time.time() - start_time
-        }
-
+        return None, _failed_result(file_path, 'Datoteka ne obstaja', start_time)
     try:
-        with Image.open(file_path) as image:
-            processed_image = preprocess_image(image.copy())
-            text = pytesseract.image_to_string(
-                processed_image,
-                lang='slv+eng',
-                config='--psm 6 --oem 3'
-            )
+        image = load_ocr_image(file_path, max_dim)
+        if skip_blank and is_blank_page(image):
+            return None, {
+                'success': True,
+                'skipped': True,
+                'original': os.path.basename(file_path),
+                'time': time.time() - start_time
+            }
+        return preprocess_image(image, max_dim), None
+    except Exception as e:
+        return None, _failed_result(file_path, e, start_time)
 
+def _rename_from_text(file_path, text, start_time):
+    """datum + ime iz OCR besedila -> preimenovanje; vrne rezultat za poročilo."""
+    try:
         date = extract_date_worker(text)
         entity = extract_name_worker(text)
 
         new_name = FILENAME_TEMPLATE.format(date=date, entity=entity)
         new_name = sanitize_filename(new_name)
-        new_path = Path(file_path).with_name(new_name)
-        new_path = ensure_unique_path(new_path)
-
-        os.rename(file_path, new_path)
+        new_path = rename_unique(file_path, Path(file_path).with_name(new_name))
 
         processing_time = time.time() - start_time
         return {
             'success': True,
-            'original': filename,
+            'original': os.path.basename(file_path),
             'new_name': os.path.basename(new_path),
             'time': processing_time,
             'date': date,
             'entity': entity,
             'text_preview': text[:200] + '...' if len(text) > 200 else text
         }
+    except Exception as e:
+        return _failed_result(file_path, e, start_time)
+
+def process_image_worker(
+    file_path, tesseract_path=None, max_dim=MAX_IMAGE_SIZE, skip_blank=False, next_path=None
+):
+    """
+    Worker function locen proces; next_path = naslednja datoteka v paketu (prefetch)
+
+    skip_blank=True: prazne strani (glej is_blank_page) se ne pošljejo v OCR in ostanejo nepreimenovane.
+    """
+    start_time = time.time()
+    prefetch_file(next_path)
+
+    _use_tesseract(tesseract_path)
 
+    image, result = _prepare_for_ocr(file_path, max_dim, skip_blank, start_time)
+    if result is not None:
+        return result
+    try:
+        text = _ocr_text(image, _RENAME_LANG, _RENAME_CONFIG)
     except Exception as e:
-        processing_time = time.time() - start_time
-        return {
-            'success': False,
-            'original': filename,
-            'error': str(e),
-            'time': processing_time
-        }
+        return _failed_result(file_path, e, start_time)
+    del image
+    return _rename_from_text(file_path, text, start_time)
+
+def process_image_batch_worker(
+    file_paths, tesseract_path=None, max_dim=MAX_IMAGE_SIZE, skip_blank=False, next_batch=None
+):
+    """
+    process_image_worker za paket datotek; rezultati po vrstnem redu vhodov.
+
+    Brez tesserocr gre cel paket v en zagon Tesseracta (seznam datotek), zato se jezikovni
+    model naloži enkrat na paket namesto za vsako sliko. next_batch = naslednji paket (prefetch).
+    """
+    for path in chain(file_paths[1:], next_batch or ()):
+        prefetch_file(path)
+
+    _use_tesseract(tesseract_path)
+
+    results = [None] * len(file_paths)
+    pending = []  # (indeks, čas priprave)
+    images = []
+    for i, file_path in enumerate(file_paths):
+        start_time = time.time()
+        image, results[i] = _prepare_for_ocr(file_path, max_dim, skip_blank, start_time)
+        if image is not None:
+            pending.append((i, time.time() - start_time))
+            images.append(image)
+    image = None
+    if not pending:
+        return results
+
+    ocr_start = time.time()
+    try:
+        texts = _ocr_texts(images, _RENAME_LANG, _RENAME_CONFIG)
+    except Exception as e:
+        for i, _ in pending:
+            results[i] = _failed_result(file_paths[i], e, ocr_start)
+        return results
+    finally:
+        # slike paketa takoj sprostimo, preimenovanje potrebuje le besedilo
+        images.clear()
+
+    # čas na sliko = lastna priprava + enak delež skupnega OCR
+    ocr_share = (time.time() - ocr_start) / len(pending)
+    for (i, prep_time), text in zip(pending, texts):
+        start_time = time.time() - ocr_share - prep_time
+        if isinstance(text, Exception):
+            results[i] = _failed_result(file_paths[i], text, start_time)
+        else:
+            results[i] = _rename_from_text(file_paths[i], text, start_time)
+    return results
+
+@lru_cache(maxsize=1)
+def _format_date(day: date) -> str:
+    """današnji datum v formatu imena; formatira se enkrat na dan in proces."""
+    return day.strftime("%d-%m-%Y")
 
 def extract_date_worker(text):
     """Worker za datum ext"""
-    current_date = datetime.today().strftime("%d-%m-%Y")
-
-    for i, pattern in enumerate(DATE_PATTERNS):
+    # formati po vrstnem redu prednosti (DATE_PATTERNS); casefold enkrat za vse
+    text = preprocess_text(text)
+    for i, pattern in enumerate(date_patterns()):
         match = pattern.search(text)
         if match:
+            a, b, c = match.group(1, 2, 3)
             if i == 0:
-                return f"{match.group(1).zfill(2)}-{match.group(2).zfill(2)}-{match.group(3)}"
+                return f"{a.zfill(2)}-{b.zfill(2)}-{c}"
             elif i == 1:
-                return f"{match.group(3).zfill(2)}-{match.group(2).zfill(2)}-{match.group(1)}"
-            else:
-                month_num = MONTH_MAP.get(match.group(2).lower(), '01')
-                return f"{match.group(1).zfill(2)}-{month_num}-{match.group(3)}"
+                return f"{c.zfill(2)}-{b.zfill(2)}-{a}"
+            return f"{a.zfill(2)}-{MONTH_MAP[b]}-{c}"
 
-    return current_date
+    return _format_date(date.today())
 
 def extract_name_worker(text):
     """Worker za ime select"""
-    lines = [line.strip() for line in text.splitlines() if line.strip()]
-
-    for i, line in enumerate(lines[:20]):
-        line_lower = line.lower()
-        for indicator in NAME_INDICATORS:
-            if indicator in line_lower:
-                parts = line.split(':', 1)
-                if len(parts) > 1:
-                    name = extract_name_from_text_worker(parts[1].strip())
-                    if name != "NEZNANO_IME":
-                        return name
-
-                if i + 1 < len(lines):
-                    name = extract_name_from_text_worker(lines[i + 1])
-                    if name != "NEZNANO_IME":
-                        return name
+    # en prehod čez vrstice: hranimo le prvih 21 (indikator + naslednja) in zadnjih 8
+    head = []
+    tail = deque(maxlen=8)
+    after_indicator = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        tail.append(line)
+        if len(head) > 20:
+            continue
+        head.append(line)
+
+        # ime v vrstici za indikatorjem
+        if after_indicator:
+            name = extract_name_from_text_worker(line)
+            if name != "NEZNANO_IME":
+                return name
+
+        # en prehod za vse indikatorje; katerikoli zadetek sproži isto logiko
+        after_indicator = len(head) <= 20 and bool(find_name_indicators(line.lower()))
+        if after_indicator:
+            parts = line.split(':', 1)
+            if len(parts) > 1:
+                name = extract_name_from_text_worker(parts[1].strip())
+                if name != "NEZNANO_IME":
+                    return name
 
     # Check first 15 lines
-    for line in lines[:15]:
+    for line in head[:15]:
         name = extract_name_from_text_worker(line)
         if name != "NEZNANO_IME":
             return name
 
     # Check last 8 lines
-    for line in lines[-8:]:
+    for line in tail:
         name = extract_name_from_text_worker(line)
         if name != "NEZNANO_IME":
             return name
 
     return "NEZNANO_IME"
 
+@lru_cache(maxsize=2048)
 def extract_name_from_text_worker(text):
-    """Worker extract ime iz besedila"""
-    for pattern in NAME_PATTERNS:
-        match = pattern.match(text)
-        if match:
-            if len(match.groups()) >= 3 and match.group(3):
-                return f"{match.group(1)}_{match.group(3)}_{match.group(2)}"
-            return f"{match.group(1)}_{match.group(2)}"
-    return "NEZNANO_IME"
+    """Worker extract ime iz besedila (čista funkcija; glave in podpisi se ponavljajo med stranmi)"""
+    # ena alternacija namesto zanke po NAME_PATTERNS; prva veja, ki ustreza, zmaga
+    regex = name_regex()
+    match = regex.fullmatch(text)
+    if match is None:
+        return "NEZNANO_IME"
+    base = regex.groupindex[match.lastgroup]
+    if match.lastgroup == 'n0':
+        first, last, third = match.group(base + 1, base + 2, base + 3)
+        if third:
+            return f"{first}_{third}_{last}"
+        return f"{first}_{last}"
+    first, last = match.group(base + 1, base + 2)
+    return f"{first}_{last}"
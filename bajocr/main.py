@@ -121,6 +121,8 @@ def main() -> None:
 
         input("\nPritisni Enter za nadaljevanje...")
 
+    processor.close()
+
 if __name__ == "__main__":
     try:
         main()